@@ -17,11 +17,16 @@ class Settings(BaseSettings):
     gemini_model: str = "models/gemini-1.5-flash"
     gemini_embedding_model: str = "models/text-embedding-004"
     edge_tts_voice: str = "es-ES-AlvaroNeural"
+    max_concurrent_messages: int = 16
+    blocking_workers: int = 32
+    response_cache_size: int = 1024
+    response_cache_ttl_seconds: float = 3600.0
+    response_cache_similarity: float = 0.95
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="allow")
 
 
-@lru_cache
+@lru_cache(maxsize=None)
 def get_settings() -> Settings:
     """Return cached application settings."""
 
@@ -5,53 +5,62 @@ from __future__ import annotations
 import asyncio
 import logging
 import tempfile
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Iterator
 
-from fastapi import APIRouter, HTTPException, Request
+import msgspec
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import PlainTextResponse
 
 from app.config import get_settings
-from app.services.audio_service import generate_audio, transcribe_audio
+from app.schemas import InboundMessage, WebhookPayload, decode_webhook
+from app.services.audio_service import synthesize_text_stream, transcribe_audio
 from app.services.rag_service import RAGEngine
-from app.services.whatsapp_client import WHATSAPP_CLIENT
+from app.services.whatsapp_client import WhatsAppClient
 
 router = APIRouter()
 LOGGER = logging.getLogger(__name__)
 SETTINGS = get_settings()
 RAG_ENGINE = RAGEngine()
-
-
-def _extract_messages(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
-    messages: List[Dict[str, Any]] = []
-    for entry in payload.get("entry", []):
-        for change in entry.get("changes", []):
-            value = change.get("value", {})
-            for message in value.get("messages", []):
-                msg_type = message.get("type")
-                from_id = message.get("from")
-                if not from_id:
-                    continue
-                if msg_type == "text":
-                    messages.append(
-                        {
-                            "from": from_id,
-                            "type": "text",
-                            "text": message.get("text", {}).get("body", ""),
-                        }
-                    )
-                elif msg_type == "audio":
-                    audio_id = message.get("audio", {}).get("id")
-                    if audio_id:
-                        messages.append(
-                            {
-                                "from": from_id,
-                                "type": "audio",
-                                "audio_id": audio_id,
-                                "mime_type": message.get("audio", {}).get("mime_type"),
-                            }
-                        )
-    return messages
+# Caps in-flight message handlers so a burst of webhooks cannot flood Gemini/Graph API.
+_GATE = asyncio.Semaphore(SETTINGS.max_concurrent_messages)
+# Recently seen WhatsApp message ids; Meta redelivers webhooks on retries.
+_SEEN_IDS: OrderedDict[str, None] = OrderedDict()
+_SEEN_IDS_MAX = 4096
+
+
+def get_whatsapp_client(request: Request) -> WhatsAppClient:
+    """Return the WhatsApp client owned by the application lifespan."""
+    return request.app.state.whatsapp_client
+
+
+def _is_duplicate(message_id: str | None) -> bool:
+    if not message_id:
+        return False
+    if message_id in _SEEN_IDS:
+        _SEEN_IDS.move_to_end(message_id)
+        return True
+    _SEEN_IDS[message_id] = None
+    if len(_SEEN_IDS) > _SEEN_IDS_MAX:
+        _SEEN_IDS.popitem(last=False)
+    return False
+
+
+def _iter_messages(payload: WebhookPayload) -> Iterator[InboundMessage]:
+    messages = (
+        message
+        for entry in payload.entry
+        for change in entry.changes
+        for message in change.value.messages
+        if message.from_
+    )
+    for message in messages:
+        if _is_duplicate(message.id):
+            LOGGER.info("Skipping duplicate delivery of message %s", message.id)
+            continue
+        if message.type == "text" or (message.type == "audio" and message.audio and message.audio.id):
+            yield message
 
 
 @router.get("/webhook")
@@ -70,88 +79,92 @@ async def verify_webhook(request: Request):
 
 
 @router.post("/webhook")
-async def receive_message(request: Request):
+async def receive_message(request: Request, client: WhatsAppClient = Depends(get_whatsapp_client)):
     """Receive and process messages from WhatsApp."""
-    body = await request.json()
-    messages = _extract_messages(body)
-    if not messages:
+    try:
+        payload = decode_webhook(await request.body())
+    except msgspec.DecodeError as exc:
+        raise HTTPException(status_code=400, detail="Invalid webhook payload") from exc
+
+    dispatched = 0
+    async with asyncio.TaskGroup() as task_group:
+        for message in _iter_messages(payload):
+            await _GATE.acquire()
+            task = task_group.create_task(handle_message(client, message))
+            task.add_done_callback(lambda _: _GATE.release())
+            dispatched += 1
+    if not dispatched:
         return {"status": "ignored"}
 
-    LOGGER.info("Received %d message(s)", len(messages))
-    tasks = [handle_message(message) for message in messages]
-    await asyncio.gather(*tasks, return_exceptions=True)
+    LOGGER.info("Processed %d message(s)", dispatched)
     return {"status": "processed"}
 
 
-async def handle_message(message: Dict[str, Any]) -> None:
+async def handle_message(client: WhatsAppClient, message: InboundMessage) -> None:
     """Route message to appropriate handler."""
     try:
-        if message["type"] == "text":
-            await _handle_text_flow(message["from"], message.get("text", ""))
-        elif message["type"] == "audio":
-            await _handle_audio_flow(message["from"], message["audio_id"], message.get("mime_type"))
+        if message.type == "text":
+            await _handle_text_flow(client, message.from_, message.text.body if message.text else "")
+        elif message.type == "audio" and message.audio:
+            await _handle_audio_flow(client, message.from_, message.audio.id, message.audio.mime_type)
     except Exception as exc:  # pylint: disable=broad-except
         LOGGER.exception("Failed to handle message: %s", exc)
-        await asyncio.to_thread(
-            WHATSAPP_CLIENT.send_message,
-            message["from"],
-            "Ocurrió un error procesando tu mensaje. Por favor, intenta nuevamente.",
-        )
+        try:
+            await client.send_message(
+                message.from_,
+                "Ocurrió un error procesando tu mensaje. Por favor, intenta nuevamente.",
+            )
+        except Exception as notify_exc:  # pylint: disable=broad-except
+            # Never let a failure escape into the TaskGroup and cancel sibling messages.
+            LOGGER.exception("Failed to notify user about error: %s", notify_exc)
 
 
-async def _handle_text_flow(user_id: str, text: str) -> None:
+async def _handle_text_flow(client: WhatsAppClient, user_id: str, text: str) -> None:
     """Handle incoming text message: RAG query -> send text response."""
     if not text:
-        await asyncio.to_thread(
-            WHATSAPP_CLIENT.send_message,
+        await client.send_message(
             user_id,
             "No recibí texto. ¿Puedes intentarlo de nuevo?",
         )
         return
     LOGGER.info("Processing text from %s: %s", user_id, text[:50])
-    rag_response = await asyncio.to_thread(RAG_ENGINE.query, text)
+    rag_response = await RAG_ENGINE.aquery(text)
     LOGGER.info("Sending text response to %s", user_id)
-    await asyncio.to_thread(WHATSAPP_CLIENT.send_message, user_id, rag_response)
+    await client.send_message(user_id, rag_response)
 
 
-async def _handle_audio_flow(user_id: str, audio_id: str, mime_type: str | None) -> None:
+async def _handle_audio_flow(
+    client: WhatsAppClient, user_id: str, audio_id: str, mime_type: str | None
+) -> None:
     """
-    Handle incoming audio: download -> transcribe (Gemini) -> RAG query ->
-    generate audio (edge-tts) -> upload -> send audio response.
+    Handle incoming audio: download -> transcribe (Gemini) -> RAG query streamed
+    into edge-tts -> upload -> send audio response.
     """
     LOGGER.info("Processing audio from %s (media_id: %s)", user_id, audio_id)
 
-    # 1. Download audio from Meta
-    media_bytes = await asyncio.to_thread(WHATSAPP_CLIENT.download_media, audio_id)
-    suffix = (mime_type or "audio/ogg").split("/")[-1]
-    with tempfile.NamedTemporaryFile(suffix=f".{suffix}", delete=False) as tmp_file:
-        tmp_file.write(media_bytes)
-        tmp_file.flush()
-        tmp_path = Path(tmp_file.name)
+    # Drop codec parameters such as "audio/ogg; codecs=opus" so the file gets a plain extension.
+    suffix = (mime_type or "audio/ogg").split(";")[0].strip().split("/")[-1]
+    # The downloaded note is only needed until it is transcribed; the directory
+    # (and anything left in it on error) is removed in one go when the block exits.
+    with tempfile.TemporaryDirectory(prefix="wa-audio-") as tmp_dir:
+        tmp_path = Path(tmp_dir) / f"in.{suffix}"
+
+        # 1. Download audio from Meta straight to disk
+        await client.download_media_to(audio_id, tmp_path)
 
-    try:
         # 2. Transcribe with Gemini
         LOGGER.info("Transcribing audio with Gemini for %s", user_id)
-        transcript = await transcribe_audio(tmp_path)
+        transcript = await transcribe_audio(tmp_path, mime_type)
         LOGGER.info("Transcript: %s", transcript[:100])
 
-        # 3. Query RAG
-        LOGGER.info("Querying RAG for %s", user_id)
-        rag_response = await asyncio.to_thread(RAG_ENGINE.query, transcript)
-
-        # 4. Generate audio with edge-tts (saves to /tmp)
-        LOGGER.info("Generating audio response with edge-tts for %s", user_id)
-        audio_path = await generate_audio(rag_response)
-
-        # 5. Upload audio to Meta
-        LOGGER.info("Uploading audio to Meta for %s", user_id)
-        media_id = await asyncio.to_thread(WHATSAPP_CLIENT.upload_media, audio_path)
+    # 3-4. Stream the RAG answer into edge-tts sentence by sentence (kept in memory)
+    LOGGER.info("Querying RAG and generating audio response for %s", user_id)
+    audio_bytes = await synthesize_text_stream(RAG_ENGINE.astream(transcript))
 
-        # 6. Send audio message
-        LOGGER.info("Sending audio response to %s", user_id)
-        await asyncio.to_thread(WHATSAPP_CLIENT.send_message, user_id, "", media_id)
+    # 5. Upload audio to Meta
+    LOGGER.info("Uploading audio to Meta for %s", user_id)
+    media_id = await client.upload_media_bytes(audio_bytes)
 
-        # Cleanup
-        audio_path.unlink(missing_ok=True)
-    finally:
-        tmp_path.unlink(missing_ok=True)
+    # 6. Send audio message
+    LOGGER.info("Sending audio response to %s", user_id)
+    await client.send_message(user_id, "", media_id)
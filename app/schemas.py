@@ -0,0 +1,55 @@
+"""Typed view of the WhatsApp Cloud API webhook payload.
+
+Only the fields the bot reads are declared; msgspec ignores everything else,
+so other webhook events (statuses, reactions, ...) decode to empty messages.
+"""
+
+from __future__ import annotations
+
+from typing import List, Optional
+
+import msgspec
+
+
+class TextBody(msgspec.Struct):
+    body: str = ""
+
+
+class AudioBody(msgspec.Struct):
+    id: str = ""
+    mime_type: Optional[str] = None
+
+
+class InboundMessage(msgspec.Struct):
+    """A single user message from ``entry[].changes[].value.messages[]``."""
+
+    from_: str = msgspec.field(name="from", default="")
+    id: str = ""
+    type: str = ""
+    text: Optional[TextBody] = None
+    audio: Optional[AudioBody] = None
+
+
+class ChangeValue(msgspec.Struct):
+    messages: List[InboundMessage] = []
+
+
+class Change(msgspec.Struct):
+    value: ChangeValue = msgspec.field(default_factory=ChangeValue)
+
+
+class Entry(msgspec.Struct):
+    changes: List[Change] = []
+
+
+class WebhookPayload(msgspec.Struct):
+    entry: List[Entry] = []
+
+
+_DECODER = msgspec.json.Decoder(WebhookPayload)
+
+
+def decode_webhook(raw: bytes) -> WebhookPayload:
+    """Parse and validate a webhook body in one pass (raises ``msgspec.DecodeError``)."""
+
+    return _DECODER.decode(raw)
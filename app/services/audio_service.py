@@ -3,66 +3,138 @@
 from __future__ import annotations
 
 import asyncio
+import io
 import logging
-import tempfile
+import re
+from functools import lru_cache
 from pathlib import Path
+from types import ModuleType
+from typing import TYPE_CHECKING, AsyncIterator, Optional
 
-import edge_tts
-from google.generativeai import upload_file
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
+import aiofiles
 
 from app.config import get_settings
 
+if TYPE_CHECKING:
+    from google.generativeai import GenerativeModel
+
 LOGGER = logging.getLogger(__name__)
 _settings = get_settings()
 
+# Gemini rejects inline requests over 20 MB; base64 encoding can inflate payloads by a third.
+_INLINE_AUDIO_LIMIT = 14 * 1024 * 1024
+# Sentence ends followed by whitespace; used to cut streamed LLM text into TTS-sized pieces.
+_SENTENCE_END = re.compile(r"[.!?…]+\s+")
+# Merge very short sentences so each edge-tts round trip carries a useful amount of speech.
+_MIN_SPEECH_CHARS = 60
+# Sentences waiting for TTS; bounds how far the LLM stream can run ahead of synthesis.
+_PIPELINE_QUEUE_SIZE = 4
 
-async def transcribe_audio(file_path: Path | str) -> str:
-    """Transcribe audio using Google Gemini 1.5 Flash."""
 
-    path = Path(file_path)
-    if not path.exists():
-        raise FileNotFoundError(f"Audio file not found: {path}")
+@lru_cache(maxsize=None)
+def _genai() -> ModuleType:
+    """Import and configure the Gemini SDK once, on first use."""
 
-    def _call_gemini_transcribe() -> str:
-        import google.generativeai as genai
-
-        genai.configure(api_key=_settings.google_api_key)
-        file_response = upload_file(str(path))
-        model = genai.GenerativeModel(_settings.gemini_model)
-        response = model.generate_content(
-            [
-                "Please transcribe this audio file. Return only the transcribed text, nothing else.",
-                file_response,
-            ],
-            safety_settings={
-                HarmCategory.HARM_CATEGORY_UNSPECIFIED: HarmBlockThreshold.BLOCK_NONE,
-                HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-            },
-        )
-        return response.text
-
-    return await asyncio.to_thread(_call_gemini_transcribe)
-
-
-async def generate_audio(text: str, output_path: Path | str | None = None) -> Path:
-    """Generate speech from text using edge-tts, save to /tmp or specified path."""
-
-    if output_path is None:
-        with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as tmp_file:
-            path = Path(tmp_file.name)
-    else:
-        path = Path(output_path)
-        path.parent.mkdir(parents=True, exist_ok=True)
+    import google.generativeai as genai
+
+    genai.configure(api_key=_settings.google_api_key)
+    return genai
+
+
+@lru_cache(maxsize=None)
+def _transcription_model() -> GenerativeModel:
+    """Return the process-wide Gemini model used for transcription."""
 
-    def _call_edge_tts() -> Path:
-        import asyncio as aio
+    return _genai().GenerativeModel(_settings.gemini_model)
 
-        async def _tts_task():
-            communicate = edge_tts.Communicate(text, voice=_settings.edge_tts_voice)
-            await communicate.save(str(path))
 
-        aio.run(_tts_task())
-        return path
+async def transcribe_audio(file_path: Path | str, mime_type: str | None = None) -> str:
+    """Transcribe audio using Google Gemini 1.5 Flash.
 
-    return await asyncio.to_thread(_call_edge_tts)
+    Voice notes are sent inline with the request; only files above the inline
+    request limit go through the File API, which costs an extra round trip.
+    """
+
+    path = Path(file_path)
+    if not path.exists():
+        raise FileNotFoundError(f"Audio file not found: {path}")
+
+    from google.generativeai.types import HarmBlockThreshold, HarmCategory
+
+    if path.stat().st_size <= _INLINE_AUDIO_LIMIT:
+        async with aiofiles.open(path, "rb") as file_obj:
+            audio_bytes = await file_obj.read()
+        # Drop codec parameters such as "audio/ogg; codecs=opus".
+        audio_mime = (mime_type or "audio/ogg").split(";")[0].strip()
+        audio_part: object = {"mime_type": audio_mime, "data": audio_bytes}
+    else:
+        # The File API upload has no async variant in the SDK; generation does.
+        audio_part = await asyncio.to_thread(_genai().upload_file, str(path))
+
+    response = await _transcription_model().generate_content_async(
+        [
+            "Please transcribe this audio file. Return only the transcribed text, nothing else.",
+            audio_part,
+        ],
+        safety_settings={
+            HarmCategory.HARM_CATEGORY_UNSPECIFIED: HarmBlockThreshold.BLOCK_NONE,
+            HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+        },
+    )
+    return response.text
+
+
+async def synthesize_audio(text: str) -> bytes:
+    """Generate speech from text using edge-tts and return the MP3 bytes in memory."""
+
+    import edge_tts
+
+    buffer = io.BytesIO()
+    communicate = edge_tts.Communicate(text, voice=_settings.edge_tts_voice)
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            buffer.write(chunk["data"])
+    return buffer.getvalue()
+
+
+async def iter_speech_chunks(deltas: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Regroup streamed text deltas into whole sentences of at least ``_MIN_SPEECH_CHARS``."""
+
+    pending = ""
+    async for delta in deltas:
+        pending += delta
+        cut = 0
+        for match in _SENTENCE_END.finditer(pending):
+            if match.end() >= _MIN_SPEECH_CHARS:
+                cut = match.end()
+        if cut:
+            yield pending[:cut].strip()
+            pending = pending[cut:]
+    if pending.strip():
+        yield pending.strip()
+
+
+async def synthesize_text_stream(deltas: AsyncIterator[str]) -> bytes:
+    """Synthesize streamed text sentence by sentence while it is still being generated.
+
+    A producer task cuts ``deltas`` into sentences and a consumer task runs
+    edge-tts on each one as soon as it is ready; the MP3 segments are
+    concatenated into a single playable file.
+    """
+
+    sentences: asyncio.Queue[Optional[str]] = asyncio.Queue(maxsize=_PIPELINE_QUEUE_SIZE)
+    audio = io.BytesIO()
+
+    async def _produce() -> None:
+        async for sentence in iter_speech_chunks(deltas):
+            await sentences.put(sentence)
+        await sentences.put(None)
+
+    async def _consume() -> None:
+        while (sentence := await sentences.get()) is not None:
+            audio.write(await synthesize_audio(sentence))
+
+    async with asyncio.TaskGroup() as task_group:
+        task_group.create_task(_produce())
+        task_group.create_task(_consume())
+    return audio.getvalue()
@@ -2,21 +2,69 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
-from threading import Lock
-from typing import Optional
-
-from llama_index.core import Settings, SimpleDirectoryReader, VectorStoreIndex
-from llama_index.embeddings.gemini import GeminiEmbedding
-from llama_index.llms.gemini import Gemini
+from threading import Event, Lock
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Iterator, List, Optional, Tuple
 
 from app.config import get_settings
+from app.services.response_cache import ResponseCache
+
+if TYPE_CHECKING:
+    from llama_index.core import VectorStoreIndex
+    from llama_index.core.base.base_query_engine import BaseQueryEngine
+    from llama_index.embeddings.gemini import GeminiEmbedding
+    from llama_index.llms.gemini import Gemini
 
 LOGGER = logging.getLogger(__name__)
+_FALLBACK_PROMPT = "You are a helpful assistant. Answer briefly: {prompt}"
+
+
+_STREAM_DONE = object()
+
+
+def _response_text(response: object) -> str:
+    if hasattr(response, "response"):
+        return response.response  # type: ignore[return-value]
+    return str(response)
+
+
+async def _iterate_in_thread(make_iterator: Callable[[], Iterator[str]]) -> AsyncIterator[str]:
+    """Drain a blocking iterator in the default executor and yield its items on the loop.
+
+    Items are small text deltas, so the hand-off queue is unbounded; back-pressure
+    is applied downstream by the consumer of this generator.
+    """
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[object] = asyncio.Queue()
+    stop = Event()
+
+    def _pump() -> None:
+        try:
+            for item in make_iterator():
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, _STREAM_DONE)
+
+    worker = loop.run_in_executor(None, _pump)
+    try:
+        while (item := await queue.get()) is not _STREAM_DONE:
+            yield item  # type: ignore[misc]
+        # Re-raise anything the stream failed with in the worker thread.
+        await worker
+    finally:
+        stop.set()
 
 
 class RAGEngine:
-    """Load documents once and expose a thread-safe query method."""
+    """Load documents once and expose thread-safe sync and async query methods.
+
+    llama_index is imported and the index is built on first use (or via
+    :meth:`warm_up`), so importing this module stays cheap.
+    """
 
     _instance: Optional["RAGEngine"] = None
     _lock: Lock = Lock()
@@ -33,46 +81,187 @@ class RAGEngine:
             return
 
         self._settings = get_settings()
-        self._query_engine = self._build_query_engine()
+        self._embed_model: Optional[GeminiEmbedding] = None
+        self._llm: Optional[Gemini] = None
+        self._cache = ResponseCache(
+            max_entries=self._settings.response_cache_size,
+            ttl_seconds=self._settings.response_cache_ttl_seconds,
+            similarity_threshold=self._settings.response_cache_similarity,
+        )
+        self._query_engine: Optional[BaseQueryEngine] = None
+        self._stream_engine: Optional[BaseQueryEngine] = None
+        self._engine_ready = False
         self._initialized = True
 
-    def _build_query_engine(self):  # type: ignore[no-untyped-def]
+    def warm_up(self) -> None:
+        """Build the query engine now instead of on the first query (blocking)."""
+
+        if self._engine_ready:
+            return
+        with self._lock:
+            if not self._engine_ready:
+                index = self._build_index()
+                if index is not None:
+                    self._query_engine = index.as_query_engine()
+                    self._stream_engine = index.as_query_engine(streaming=True)
+                self._engine_ready = True
+
+    def _build_index(self) -> Optional[VectorStoreIndex]:
         data_dir = self._settings.data_dir
         if not data_dir.exists():
             LOGGER.warning("Data directory %s not found; using fallback responses.", data_dir)
             return None
 
+        # Imports stay inside the try: warm_up usually runs as a fire-and-forget
+        # executor job, so anything raised here must be logged rather than lost.
         try:
-            Settings.llm = Gemini(
-                model=self._settings.gemini_model,
-                api_key=self._settings.google_api_key,
-            )
-            Settings.embed_model = GeminiEmbedding(
+            from llama_index.core import Settings, SimpleDirectoryReader, VectorStoreIndex
+            from llama_index.embeddings.gemini import GeminiEmbedding
+
+            Settings.llm = self._get_llm()
+            embed_model = GeminiEmbedding(
                 model_name=self._settings.gemini_embedding_model,
                 api_key=self._settings.google_api_key,
             )
+            Settings.embed_model = embed_model
             documents = SimpleDirectoryReader(input_dir=str(data_dir)).load_data()
             if not documents:
                 LOGGER.warning("No documents found under %s; using fallback responses.", data_dir)
                 return None
             index = VectorStoreIndex.from_documents(documents)
-            return index.as_query_engine()
+            self._embed_model = embed_model
+            return index
         except Exception as exc:  # pylint: disable=broad-except
             LOGGER.exception("Failed to build RAG index: %s", exc)
             return None
 
+    def _get_llm(self) -> Gemini:
+        """Return the shared Gemini LLM, creating it on first use."""
+
+        if self._llm is None:
+            from llama_index.llms.gemini import Gemini
+
+            self._llm = Gemini(
+                model=self._settings.gemini_model,
+                api_key=self._settings.google_api_key,
+            )
+        return self._llm
+
     def query(self, prompt: str) -> str:
         if not prompt:
             return "No input provided."
+        self.warm_up()
         if self._query_engine is None:
-            llm = Gemini(
-                model=self._settings.gemini_model,
-                api_key=self._settings.google_api_key,
+            response = self._get_llm().complete(_FALLBACK_PROMPT.format(prompt=prompt))
+            return response.text
+
+        return _response_text(self._query_engine.query(prompt))
+
+    async def aquery(self, prompt: str) -> str:
+        """Async counterpart of :meth:`query` with an exact + semantic response cache.
+
+        Gemini calls run in the default executor because the pinned llama_index
+        Gemini integration has no native async implementation.
+        """
+
+        if not prompt:
+            return "No input provided."
+
+        key, cached, embedding = await self._alookup(prompt)
+        if cached is not None:
+            return cached
+
+        answer = await self._aanswer(prompt, embedding)
+        self._cache.put(key, answer, embedding)
+        return answer
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the answer as text deltas while Gemini is still generating it.
+
+        Cache hits are yielded as a single chunk; a fully consumed stream is cached.
+        """
+
+        if not prompt:
+            yield "No input provided."
+            return
+
+        key, cached, embedding = await self._alookup(prompt)
+        if cached is not None:
+            yield cached
+            return
+
+        parts: List[str] = []
+        async for delta in self._astream_answer(prompt, embedding):
+            parts.append(delta)
+            yield delta
+        self._cache.put(key, "".join(parts), embedding)
+
+    async def _alookup(self, prompt: str) -> Tuple[str, Optional[str], Optional[List[float]]]:
+        """Return the cache key, a cached answer if any, and the prompt embedding."""
+
+        if not self._engine_ready:
+            await asyncio.to_thread(self.warm_up)
+
+        key = self._cache.normalize(prompt)
+        cached = self._cache.get(key)
+        if cached is not None:
+            LOGGER.info("RAG cache hit (exact)")
+            return key, cached, None
+
+        embedding = await self._aembed(prompt)
+        if embedding is not None:
+            cached = self._cache.get_similar(embedding)
+            if cached is not None:
+                LOGGER.info("RAG cache hit (semantic)")
+        return key, cached, embedding
+
+    async def _aembed(self, prompt: str) -> Optional[List[float]]:
+        if self._embed_model is None:
+            return None
+        try:
+            # GeminiEmbedding 0.1.x has no real async path (aget_* wraps the sync call).
+            return await asyncio.to_thread(self._embed_model.get_query_embedding, prompt)
+        except Exception as exc:  # pylint: disable=broad-except
+            LOGGER.warning("Failed to embed prompt for cache lookup: %s", exc)
+            return None
+
+    async def _aanswer(self, prompt: str, embedding: Optional[List[float]]) -> str:
+        # llama-index-llms-gemini 0.1.x only implements the sync API; its async
+        # methods call the blocking SDK inside a coroutine, so stay off the loop.
+        if self._query_engine is None:
+            # _get_llm() may import llama_index and build the client (a blocking
+            # get_model call) on first use, so it runs in the thread too.
+            response = await asyncio.to_thread(
+                lambda: self._get_llm().complete(_FALLBACK_PROMPT.format(prompt=prompt))
             )
-            response = llm.complete(f"You are a helpful assistant. Answer briefly: {prompt}")
             return response.text
 
-        response = self._query_engine.query(prompt)
-        if hasattr(response, "response"):
-            return response.response  # type: ignore[return-value]
-        return str(response)
+        from llama_index.core import QueryBundle
+
+        # Reuse the cache-lookup embedding so retrieval does not embed the prompt again.
+        response = await asyncio.to_thread(
+            self._query_engine.query, QueryBundle(query_str=prompt, embedding=embedding)
+        )
+        return _response_text(response)
+
+    async def _astream_answer(self, prompt: str, embedding: Optional[List[float]]) -> AsyncIterator[str]:
+        # llama-index-llms-gemini 0.1.x only streams synchronously (its astream_* wrap
+        # the sync generator), so the Gemini stream is drained in a worker thread.
+        async for delta in _iterate_in_thread(lambda: self._stream_deltas(prompt, embedding)):
+            yield delta
+
+    def _stream_deltas(self, prompt: str, embedding: Optional[List[float]]) -> Iterator[str]:
+        if self._stream_engine is None:
+            for chunk in self._get_llm().stream_complete(_FALLBACK_PROMPT.format(prompt=prompt)):
+                if chunk.delta:
+                    yield chunk.delta
+            return
+
+        from llama_index.core import QueryBundle
+
+        response = self._stream_engine.query(QueryBundle(query_str=prompt, embedding=embedding))
+        response_gen = getattr(response, "response_gen", None)
+        if response_gen is None:
+            yield _response_text(response)
+            return
+        yield from response_gen
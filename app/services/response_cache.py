@@ -0,0 +1,123 @@
+"""Bounded in-memory cache for RAG responses with exact and semantic lookup."""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional, Sequence
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+@dataclass(slots=True)
+class _CacheEntry:
+    response: str
+    expires_at: float
+    slot: Optional[int] = None
+
+
+class ResponseCache:
+    """LRU + TTL cache keyed by normalized prompt, with a cosine-similarity fallback.
+
+    Exact hits are served from an ``OrderedDict``. Entries stored with an
+    embedding also occupy a row of a preallocated, L2-normalized matrix so a
+    near-duplicate prompt can be matched with a single matrix-vector product.
+    Not thread-safe: it is meant to be used from the event loop only. numpy is
+    imported on first semantic use so constructing the cache stays cheap.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, similarity_threshold: float) -> None:
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._similarity_threshold = similarity_threshold
+        self._entries: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._slot_keys: list[Optional[str]] = [None] * max_entries
+        self._free_slots: list[int] = list(range(max_entries - 1, -1, -1))
+
+    @staticmethod
+    def normalize(prompt: str) -> str:
+        """Return the exact-match key for ``prompt`` (lowercased, whitespace-collapsed)."""
+
+        return " ".join(prompt.lower().split())
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for an exact key, if present and fresh."""
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._evict(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry.response
+
+    def get_similar(self, embedding: Sequence[float]) -> Optional[str]:
+        """Return the response of the most similar cached prompt above the threshold."""
+
+        if self._matrix is None or not self._entries:
+            return None
+        import numpy as np
+
+        query = self._unit_vector(embedding)
+        if query is None or query.shape[0] != self._matrix.shape[1]:
+            return None
+
+        # Unused rows are all zeros, so they score 0 and never pass the threshold.
+        scores = self._matrix @ query
+        best = int(np.argmax(scores))
+        if scores[best] < self._similarity_threshold:
+            return None
+        key = self._slot_keys[best]
+        return self.get(key) if key is not None else None
+
+    def put(self, key: str, response: str, embedding: Optional[Sequence[float]] = None) -> None:
+        """Store ``response`` under ``key``, evicting expired and least recently used entries."""
+
+        if self._max_entries <= 0:
+            return
+        if key in self._entries:
+            self._evict(key)
+        self._evict_expired()
+        while len(self._entries) >= self._max_entries:
+            self._evict(next(iter(self._entries)))
+
+        entry = _CacheEntry(response=response, expires_at=time.monotonic() + self._ttl_seconds)
+        vector = self._unit_vector(embedding) if embedding is not None else None
+        if vector is not None:
+            if self._matrix is None:
+                import numpy as np
+
+                self._matrix = np.zeros((self._max_entries, vector.shape[0]), dtype=np.float32)
+            if vector.shape[0] == self._matrix.shape[1]:
+                slot = self._free_slots.pop()
+                self._matrix[slot] = vector
+                self._slot_keys[slot] = key
+                entry.slot = slot
+        self._entries[key] = entry
+
+    def _evict(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        if entry.slot is not None and self._matrix is not None:
+            self._matrix[entry.slot] = 0.0
+            self._slot_keys[entry.slot] = None
+            self._free_slots.append(entry.slot)
+
+    def _evict_expired(self) -> None:
+        now = time.monotonic()
+        expired = [key for key, entry in self._entries.items() if entry.expires_at <= now]
+        for key in expired:
+            self._evict(key)
+
+    @staticmethod
+    def _unit_vector(embedding: Sequence[float]) -> Optional[np.ndarray]:
+        import numpy as np
+
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        if vector.ndim != 1 or norm == 0.0:
+            return None
+        return vector / norm
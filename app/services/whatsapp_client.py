@@ -6,60 +6,82 @@ import logging
 from pathlib import Path
 from typing import Optional
 
-import requests
+import aiofiles
+import httpx
 
 from app.config import get_settings
 
 LOGGER = logging.getLogger(__name__)
+_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# WhatsApp Cloud API limit for text message bodies.
+_MAX_TEXT_LENGTH = 4096
 
 
 class WhatsAppClient:
-    """Simple wrapper around the Graph API for WhatsApp Cloud."""
+    """Simple async wrapper around the Graph API for WhatsApp Cloud."""
 
     def __init__(self) -> None:
         self._settings = get_settings()
         self._base_url = f"https://graph.facebook.com/{self._settings.graph_version}"
         self._token = self._settings.whatsapp_token
         self._phone_number_id = self._settings.phone_number_id
-
-    def _auth_headers(self) -> dict[str, str]:
-        return {"Authorization": f"Bearer {self._token}"}
-
-    def download_media(self, media_id: str) -> bytes:
-        """Retrieve binary content for a media asset."""
-
-        meta_url = f"{self._base_url}/{media_id}"
-        resp = requests.get(meta_url, headers=self._auth_headers(), params={"fields": "url"}, timeout=30)
+        # Built once and installed as client defaults, so no request rebuilds them.
+        self._headers = {"Authorization": f"Bearer {self._token}"}
+        self._client = httpx.AsyncClient(
+            base_url=self._base_url,
+            headers=self._headers,
+            timeout=30,
+            # One multiplexed HTTP/2 connection to graph.facebook.com carries the
+            # metadata, download, upload and send calls without new TLS handshakes.
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=100,
+                max_keepalive_connections=32,
+                keepalive_expiry=60,
+            ),
+        )
+
+    async def aclose(self) -> None:
+        """Close the underlying HTTP connection pool."""
+
+        await self._client.aclose()
+
+    async def download_media_to(self, media_id: str, dst: Path | str) -> Path:
+        """Stream a media asset to ``dst`` without buffering it in memory."""
+
+        resp = await self._client.get(f"/{media_id}", params={"fields": "url"})
         resp.raise_for_status()
         media_url: Optional[str] = resp.json().get("url")
         if not media_url:
             raise RuntimeError("Media URL missing from WhatsApp response")
 
-        media_resp = requests.get(media_url, headers=self._auth_headers(), timeout=30)
-        media_resp.raise_for_status()
-        return media_resp.content
-
-    def upload_media(self, file_path: Path | str) -> str:
-        """Upload an audio file and return the media id."""
-
-        path = Path(file_path)
-        if not path.exists():
-            raise FileNotFoundError(f"File not found: {path}")
-
-        url = f"{self._base_url}/{self._phone_number_id}/media"
-        files = {"file": (path.name, path.read_bytes(), "audio/mpeg")}
-        data = {"messaging_product": "whatsapp"}
-        resp = requests.post(url, headers=self._auth_headers(), data=data, files=files, timeout=30)
+        path = Path(dst)
+        async with self._client.stream("GET", media_url) as media_resp:
+            media_resp.raise_for_status()
+            async with aiofiles.open(path, "wb") as file_obj:
+                async for chunk in media_resp.aiter_bytes(_DOWNLOAD_CHUNK_SIZE):
+                    await file_obj.write(chunk)
+        return path
+
+    async def upload_media_bytes(self, blob: bytes, filename: str = "audio.mp3") -> str:
+        """Upload in-memory MP3 audio and return the media id."""
+
+        if not blob:
+            raise ValueError("Cannot upload empty audio content")
+        resp = await self._client.post(
+            f"/{self._phone_number_id}/media",
+            data={"messaging_product": "whatsapp"},
+            files={"file": (filename, blob, "audio/mpeg")},
+        )
         resp.raise_for_status()
         media_id: Optional[str] = resp.json().get("id")
         if not media_id:
             raise RuntimeError("Failed to obtain media id from WhatsApp")
         return media_id
 
-    def send_message(self, to: str, text: str, media_id: Optional[str] = None) -> None:
+    async def send_message(self, to: str, text: str, media_id: Optional[str] = None) -> None:
         """Send a text or audio message to a WhatsApp user."""
 
-        url = f"{self._base_url}/{self._phone_number_id}/messages"
         payload: dict[str, object] = {
             "messaging_product": "whatsapp",
             "to": to,
@@ -70,10 +92,10 @@ class WhatsAppClient:
         else:
             if not text:
                 raise ValueError("Text message body is required when media_id is not provided")
-            payload.update({"type": "text", "text": {"body": text[:1000]}})
+            body = text if len(text) <= _MAX_TEXT_LENGTH else text[:_MAX_TEXT_LENGTH]
+            payload.update({"type": "text", "text": {"body": body}})
 
-        resp = requests.post(url, headers={**self._auth_headers(), "Content-Type": "application/json"}, json=payload, timeout=30)
+        # httpx sets Content-Type: application/json for json= bodies.
+        resp = await self._client.post(f"/{self._phone_number_id}/messages", json=payload)
         resp.raise_for_status()
 
-
-WHATSAPP_CLIENT = WhatsAppClient()
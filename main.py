@@ -2,19 +2,46 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
 from fastapi import FastAPI
 
+from app.config import get_settings
+from app.routers.whatsapp import RAG_ENGINE
 from app.routers.whatsapp import router as whatsapp_router
+from app.services.whatsapp_client import WhatsAppClient
 
 logging.basicConfig(level=logging.INFO)
 
 
+@asynccontextmanager
+async def lifespan(application: FastAPI) -> AsyncIterator[None]:
+    """Create shared resources on startup and release them on shutdown."""
+
+    executor = ThreadPoolExecutor(
+        max_workers=get_settings().blocking_workers,
+        thread_name_prefix="wa-blocking",
+    )
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(executor)
+    # Build the RAG index in the background so startup (and webhook verification) is not delayed.
+    # The build cannot be interrupted; shutdown waits for it to finish in the executor.
+    loop.run_in_executor(None, RAG_ENGINE.warm_up)
+    application.state.whatsapp_client = WhatsAppClient()
+    try:
+        yield
+    finally:
+        await application.state.whatsapp_client.aclose()
+
+
 def create_app() -> FastAPI:
     """Create and configure FastAPI application."""
 
-    application = FastAPI()
+    application = FastAPI(lifespan=lifespan)
     application.include_router(whatsapp_router)
     return application
 